@@ -0,0 +1,238 @@
+import base64
+import binascii
+import csv
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from dhl.resources.response import DHLPodExportResponse
+
+
+class DHLPodExporter:
+    """
+    Exports the proofs of delivery of many shipments into ZIP or tar archives in an output directory.
+
+    PODs are fetched concurrently and each one is decoded in chunks to a spooled temporary file as it arrives, and
+    added to the archive once it decoded completely, so an invalid POD never leaves a partial file behind. The
+    archive is written in parts of part_size PODs (pod-00001.zip, pod-00002.zip ...) and the manifest.csv lines of a
+    part are written only once the part is complete. Running the export again with the same output directory skips
+    the shipments already in the manifest and replaces a part left incomplete by an interrupted run.
+    """
+
+    FORMAT_ZIP = 'zip'
+    FORMAT_TAR = 'tar'
+    FORMAT_TAR_GZ = 'tar.gz'
+
+    STATUS_OK = 'ok'
+    STATUS_ERROR = 'error'
+
+    manifest_name = 'manifest.csv'
+    manifest_fields = ['awb', 'status', 'part', 'detail']
+    chunk_size = 64 * 1024  # base64 characters decoded at once
+
+    def __init__(self, service, output_dir, archive_format=FORMAT_ZIP, part_size=1000, max_workers=8,
+                 detailed=True, retry_failed=False):
+        self.service = service
+        self.output_dir = output_dir
+        self.archive_format = archive_format
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.detailed = detailed
+        self.retry_failed = retry_failed  # if the shipments DHL returned errors for should be requested again
+        self._local = threading.local()
+
+    def export(self, shipment_awbs):
+        """
+        Exports the PODs of the shipments that are not in the manifest yet.
+        :param shipment_awbs: iterable of shipment waybills
+        :return: DHLPodExportResponse
+        """
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+
+        done, last_part = self._read_manifest()
+        pending = []
+        skipped = 0
+        for shipment_awb in shipment_awbs:
+            shipment_awb = str(shipment_awb)
+            if shipment_awb in done:
+                skipped += 1
+            else:
+                done.add(shipment_awb)  # also drops duplicates in the input
+                pending.append(shipment_awb)
+
+        response = DHLPodExportResponse(True, skipped=skipped)
+        part = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            awbs = iter(pending)
+            futures = {}
+            while True:
+                # keep a limited number of requests in flight, so the PODs are not all held in memory at once
+                while len(futures) < self.max_workers * 2:
+                    shipment_awb = next(awbs, None)
+                    if shipment_awb is None:
+                        break
+                    futures[executor.submit(self._fetch, shipment_awb)] = shipment_awb
+                if not futures:
+                    break
+
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    shipment_awb = futures.pop(future)
+                    try:
+                        pod_response = future.result()
+                    except Exception as e:  # not recorded in the manifest, so it is retried on the next run
+                        response.errors.append((shipment_awb, e))
+                        continue
+
+                    if part is None:
+                        last_part += 1
+                        part = _ArchivePart(self._part_path(last_part), self.archive_format)
+                    if pod_response.success:
+                        try:
+                            pod_file = self._decode(pod_response.pod_bytes)
+                        except (binascii.Error, ValueError, TypeError) as e:
+                            part.lines.append([shipment_awb, self.STATUS_ERROR, last_part, 'Invalid POD: %s' % e])
+                            response.failed += 1
+                        else:
+                            name = '%s.pdf' % shipment_awb
+                            with pod_file:
+                                part.add(name, pod_file)
+                            part.lines.append([shipment_awb, self.STATUS_OK, last_part, name])
+                            response.exported += 1
+                    else:
+                        detail = '; '.join(str(error) for error in pod_response.errors or [])
+                        part.lines.append([shipment_awb, self.STATUS_ERROR, last_part, detail])
+                        response.failed += 1
+
+                    if len(part.lines) >= self.part_size:
+                        self._close_part(part)
+                        part = None
+
+        if part is not None:
+            self._close_part(part)
+
+        response.success = not response.errors
+        return response
+
+    ########################################################################
+    # PRIVATE METHODS ######################################################
+    ########################################################################
+
+    def _fetch(self, shipment_awb):
+        """
+        Requests the POD with a copy of the service made once per worker thread.
+        :param shipment_awb: shipment waybill
+        :return: DHLPodResponse
+        """
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            service = self.service._thread_copy()
+            self._local.service = service
+        return service.proof_of_delivery(shipment_awb, self.detailed)
+
+    def _decode(self, pod_bytes):
+        """
+        Decodes the base64 POD in chunks to a spooled temporary file.
+        :param pod_bytes: base64 encoded POD
+        :return: the decoded file, positioned at the start
+        """
+        if isinstance(pod_bytes, str):
+            pod_bytes = pod_bytes.encode('ascii')
+
+        pod_file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+        try:
+            remainder = b''
+            for start in range(0, len(pod_bytes), self.chunk_size):
+                chunk = remainder + re.sub(rb'\s+', b'', pod_bytes[start:start + self.chunk_size])
+                cut = len(chunk) - len(chunk) % 4
+                remainder = chunk[cut:]
+                pod_file.write(base64.b64decode(chunk[:cut], validate=True))
+            if remainder:
+                raise binascii.Error('Incomplete base64 data.')
+        except Exception:
+            pod_file.close()
+            raise
+
+        pod_file.seek(0)
+        return pod_file
+
+    def _read_manifest(self):
+        """
+        Reads the shipments already exported by previous runs.
+        :return: set of shipment waybills, number of the last complete part
+        """
+        done = set()
+        last_part = 0
+        path = os.path.join(self.output_dir, self.manifest_name)
+        if not os.path.exists(path):
+            return done, last_part
+
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                if row['status'] == self.STATUS_OK or not self.retry_failed:
+                    done.add(row['awb'])
+                last_part = max(last_part, int(row['part']))
+        return done, last_part
+
+    def _close_part(self, part):
+        """
+        Completes the archive part and only then records its shipments in the manifest.
+        :param part: _ArchivePart
+        :return:
+        """
+        part.close()
+
+        path = os.path.join(self.output_dir, self.manifest_name)
+        new_manifest = not os.path.exists(path)
+        with open(path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            if new_manifest:
+                writer.writerow(self.manifest_fields)
+            writer.writerows(part.lines)
+
+    def _part_path(self, number):
+        return os.path.join(self.output_dir, 'pod-%05d.%s' % (number, self.archive_format))
+
+
+class _ArchivePart:
+    """
+    A single archive file of the export.
+    """
+
+    def __init__(self, path, archive_format):
+        self.path = path
+        self.lines = []  # manifest lines of the shipments in this part
+        if archive_format == DHLPodExporter.FORMAT_ZIP:
+            self.zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED)
+            self.tar = None
+        else:
+            self.zip = None
+            self.tar = tarfile.open(path, 'w:gz' if archive_format == DHLPodExporter.FORMAT_TAR_GZ else 'w')
+
+    def add(self, name, pod_file):
+        """
+        Adds a decoded POD to the archive.
+        :param name: file name in the archive
+        :param pod_file: decoded file, positioned at the start
+        :return:
+        """
+        if self.zip:
+            with self.zip.open(name, 'w') as f:
+                shutil.copyfileobj(pod_file, f)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = pod_file.seek(0, os.SEEK_END)
+            pod_file.seek(0)
+            self.tar.addfile(info, pod_file)
+
+    def close(self):
+        if self.zip:
+            self.zip.close()
+        else:
+            self.tar.close()
@@ -0,0 +1,177 @@
+import base64
+import queue
+import socket
+import threading
+
+
+class DHLLabelPrinter:
+    """
+    Sends thermal (ZPL/EPL) labels straight to a network printer over a raw TCP socket (port 9100).
+    Labels are queued and sent in batches by a pool of pool_size worker threads, each keeping its own connection open
+    between batches. Printers close idle connections and a write to such a connection is silently lost, so a
+    connection is checked before it is reused and replaced if the printer has closed it.
+    """
+
+    thermal_label_types = ('ZPL', 'EPL')
+    close_timeout = 1  # seconds to wait for the printer to close its side when closing a connection
+
+    def __init__(self, host, port=9100, pool_size=1, batch_size=20, timeout=10):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.errors = []  # [(decoded label, exception) ...] for the labels that could not be sent
+        self._queue = queue.Queue()
+        self._workers = []
+        self._closed = False
+
+    def print_label(self, label_bytes):
+        """
+        Queues a base64 encoded label, as returned by DHL, for printing.
+        :param label_bytes: base64 encoded label
+        :return:
+        """
+        if self._closed:
+            raise RuntimeError('Printer %s:%s is closed.' % (self.host, self.port))
+        if len(self._workers) < self.pool_size:
+            self._start_worker()
+        self._queue.put(base64.b64decode(label_bytes))
+
+    def print_response(self, shipment_response):
+        """
+        Queues all the labels of a successful shipment response for printing. Only thermal labels can be printed.
+        :param shipment_response: DHLShipmentResponse object
+        :return:
+        """
+        if shipment_response.label_type not in self.thermal_label_types:
+            raise ValueError('Only %s labels can be sent to a printer, not %s.' % (
+                '/'.join(self.thermal_label_types), shipment_response.label_type))
+
+        for label_bytes in shipment_response.labels:
+            self.print_label(label_bytes)
+
+    def flush(self):
+        """
+        Blocks until all the queued labels are sent (or failed, see errors).
+        :return:
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Sends the remaining labels, stops the workers and closes their connections.
+        :return:
+        """
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    ########################################################################
+    # PRIVATE METHODS ######################################################
+    ########################################################################
+
+    def _start_worker(self):
+        worker = threading.Thread(target=self._work)
+        worker.daemon = True
+        worker.start()
+        self._workers.append(worker)
+
+    def _work(self):
+        """
+        Worker loop: waits for a label, takes the labels queued behind it up to the batch size, and sends them with
+        a single write on its connection.
+        :return:
+        """
+        connection = None
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None  # every worker takes exactly one stop marker
+            labels = [label for label in batch if label is not None]
+
+            if labels:
+                connection = self._send(connection, labels)
+            for _ in batch:
+                self._queue.task_done()
+
+        if connection:
+            self._close(connection)
+
+    def _send(self, connection, labels):
+        """
+        Sends the labels, replacing the connection if the printer has closed it, and trying once more on a new
+        connection if connecting or writing fails.
+        :param connection: open socket or None
+        :param labels: list of decoded labels
+        :return: the open socket or None if sending failed
+        """
+        if connection and not self._is_open(connection):
+            connection.close()
+            connection = None
+
+        data = b''.join(labels)
+        for attempt in range(2):
+            try:
+                if not connection:
+                    connection = socket.create_connection((self.host, self.port), self.timeout)
+                connection.sendall(data)
+                return connection
+            except OSError as e:
+                error = e
+                if connection:
+                    connection.close()
+                    connection = None
+
+        self.errors += [(label, error) for label in labels]
+        return None
+
+    def _is_open(self, connection):
+        """
+        Checks without blocking if the printer has closed the connection. Status messages sent by the printer are
+        read and ignored.
+        :param connection: socket
+        :return: True if the connection can be reused
+        """
+        connection.setblocking(False)
+        try:
+            while connection.recv(1024):
+                pass
+            return False  # the printer closed its side
+        except BlockingIOError:
+            return True  # nothing to read, the connection is still open
+        except OSError:
+            return False
+        finally:
+            connection.settimeout(self.timeout)
+
+    def _close(self, connection):
+        """
+        Closes a connection, waiting at most close_timeout for the printer to close its side, so the connection is not
+        reset while the printer is still reading.
+        :param connection: socket
+        :return:
+        """
+        try:
+            connection.shutdown(socket.SHUT_WR)
+            connection.settimeout(self.close_timeout)
+            while connection.recv(1024):  # printer status messages are ignored
+                pass
+        except OSError:
+            pass  # the printer already has the labels
+        finally:
+            connection.close()
@@ -0,0 +1,147 @@
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+from dhl.resources.response import DHLTrackingResponse, DHLTrackingEvent
+
+
+class DHLPushReceiver:
+    """
+    Embeddable HTTP endpoint that accepts pushed shipment status notifications and publishes them to a
+    DHLTrackingStream, as an alternative to polling DHLService.tracking().
+
+    Notifications are POSTed as JSON:
+        {"shipments": [{"awb": "1234567890",
+                        "events": [{"piece": "JD014600003...", "code": "PU", "description": "Shipment picked up",
+                                    "location_code": "LJU", "location_description": "LJUBLJANA - SLOVENIA",
+                                    "date": "2015-02-09", "time": "18:00:00"}, ...]}, ...]}
+    Events without a piece are shipment events. Override parse_notification() for other payloads.
+
+    By default the receiver only listens on the loopback interface. Binding it to another interface requires a token.
+    """
+
+    max_body_size = 1024 * 1024  # bytes, larger notifications are rejected
+
+    def __init__(self, stream, host='127.0.0.1', port=8080, path='/', token=None):
+        self.stream = stream
+        self.host = host
+        self.port = port
+        self.path = path
+        self.token = token  # if set, requests need a matching Authorization header
+        self.server = None
+        self._thread = None
+
+    def start(self):
+        """
+        Starts serving in a background thread.
+        :return:
+        """
+        if not self.token and self.host not in ('127.0.0.1', '::1', 'localhost'):
+            raise ValueError('A token is required to receive notifications on %s.' % self.host)
+
+        self.server = _ThreadingHTTPServer((self.host, self.port), self._create_handler())
+        self.port = self.server.server_address[1]  # the real port when started with port 0
+        self._thread = threading.Thread(target=self.server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the server and delivers the updates waiting in the stream.
+        :return:
+        """
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self._thread.join()
+            self.server = None
+        self.stream.flush()
+
+    def parse_notification(self, notification):
+        """
+        Converts a decoded notification to tracking updates.
+        :param notification: decoded JSON payload
+        :return: list of (awb, DHLTrackingResponse)
+        """
+        updates = []
+        for shipment in notification['shipments']:
+            shipment_events = []
+            pieces_events = {}
+            for event in shipment['events']:
+                tracking_event = DHLTrackingEvent(
+                    date=event.get('date'),
+                    time=event.get('time'),
+                    code=event.get('code'),
+                    description=event.get('description'),
+                    location_code=event.get('location_code'),
+                    location_description=event.get('location_description')
+                )
+                if event.get('piece'):
+                    pieces_events.setdefault(event['piece'], []).append(tracking_event)
+                else:
+                    shipment_events.append(tracking_event)
+
+            updates.append((shipment['awb'], DHLTrackingResponse(
+                success=True,
+                shipment_events=shipment_events,
+                pieces_events=pieces_events
+            )))
+        return updates
+
+    ########################################################################
+    # PRIVATE METHODS ######################################################
+    ########################################################################
+
+    def _create_handler(self):
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.split('?')[0] != receiver.path:
+                    return self._reply(404, 'Not found.')
+                if receiver.token and not hmac.compare_digest(
+                        self.headers.get('Authorization', '').encode('utf-8'),
+                        receiver.token.encode('utf-8')):
+                    return self._reply(401, 'Unauthorized.')
+
+                if self.headers.get('Content-Length') is None:
+                    return self._reply(411, 'Content-Length required.')
+                try:
+                    length = int(self.headers['Content-Length'])
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    return self._reply(400, 'Invalid Content-Length.')
+                if length > receiver.max_body_size:
+                    return self._reply(413, 'Notification too large.')
+
+                try:
+                    updates = receiver.parse_notification(json.loads(self.rfile.read(length).decode('utf-8')))
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    return self._reply(400, 'Invalid notification: %s' % e)
+
+                try:
+                    for shipment_awb, tracking_response in updates:
+                        receiver.stream.publish(shipment_awb, tracking_response)
+                except RuntimeError as e:  # the stream is closed
+                    return self._reply(503, str(e))
+                self._reply(200, 'OK')
+
+            def _reply(self, code, message):
+                body = message.encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
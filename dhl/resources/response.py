@@ -35,13 +35,56 @@ class DHLRateResponse(DHLResponse):
 
 class DHLShipmentResponse(DHLResponse):
     def __init__(self, success, tracking_numbers=None, identification_number=None, dispatch_number=None,
-                 label_bytes=None, errors=None):
+                 label_bytes=None, errors=None, label_type=None):
         DHLResponse.__init__(self, success, errors)
 
         self.tracking_numbers = tracking_numbers
         self.identification_number = identification_number
         self.dispatch_number = dispatch_number
         self.label_bytes = label_bytes
+        self.label_type = label_type  # e.g. 'PDF', 'ZPL'
+        self.identification_numbers = [identification_number] if identification_number else []
+        self.labels = [label_bytes] if label_bytes else []
+        self.sub_responses = None
+
+    @staticmethod
+    def merge(responses, label_type=None):
+        """
+        Combines the responses of sub-shipments into a single response. Thermal (ZPL/EPL) labels are joined into a
+        single label in label_bytes. Other labels, e.g. PDF, can not be joined, so label_bytes is only set when there
+        is a single label and all of them are available in labels.
+        The first created sub-shipment provides the identification number and the dispatch number, the waybills of all
+        the sub-shipments are in identification_numbers.
+        :param responses: list of DHLShipmentResponse objects
+        :param label_type: label type of the sub-shipments
+        :return: DHLShipmentResponse
+        """
+        import base64
+
+        created = [response for response in responses if response.success] or responses
+        merged = DHLShipmentResponse(
+            success=all(response.success for response in responses),
+            tracking_numbers=[],
+            identification_number=created[0].identification_number,
+            dispatch_number=created[0].dispatch_number,
+            label_type=label_type
+        )
+        merged.identification_numbers = []
+        errors = []
+        for response in responses:
+            merged.tracking_numbers += response.tracking_numbers or []
+            merged.identification_numbers += response.identification_numbers
+            merged.labels += response.labels
+            errors += response.errors or []
+        merged.errors = errors or None
+        merged.sub_responses = responses
+
+        if len(merged.labels) == 1:
+            merged.label_bytes = merged.labels[0]
+        elif merged.labels and label_type in ('ZPL', 'EPL'):
+            decoded_labels = [base64.b64decode(label_bytes) for label_bytes in merged.labels]
+            merged.label_bytes = base64.b64encode(b''.join(decoded_labels)).decode('ascii')
+        return merged
 
 
 class DHLTrackingResponse(DHLResponse):
@@ -60,6 +103,16 @@ class DHLPodResponse(DHLResponse):
         self.pod_bytes = pod_bytes
 
 
+class DHLPodExportResponse(DHLResponse):
+    def __init__(self, success, exported=0, failed=0, skipped=0, errors=None):
+        DHLResponse.__init__(self, success, errors or [])
+
+        self.exported = exported  # PODs written to the archive
+        self.failed = failed  # shipments DHL returned errors for, recorded in the manifest
+        self.skipped = skipped  # shipments already in the manifest
+        # errors: [(awb, exception) ...] for the requests that failed and will be retried on the next run
+
+
 class DHLTrackingEvent:
     def __init__(self, code=None, description=None, location_code=None, location_description=None, date=None,
                  time=None):
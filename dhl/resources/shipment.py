@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+import copy
 import time
 
 
@@ -27,8 +28,13 @@ class DHLShipment:
     CUSTOMS_DOCUMENTS = 'DOCUMENTS'
     CUSTOMS_NON_DOCUMENTS = 'NON_DOCUMENTS'
 
-    label_type = 'PDF'
+    LABEL_TYPE_PDF = 'PDF'
+    LABEL_TYPE_ZPL = 'ZPL'
+    LABEL_TYPE_EPL = 'EPL'
+
+    label_type = LABEL_TYPE_PDF  # default, can be set per shipment or per service type in service_label_formats
     label_template = 'ECOM26_84_001'
+    service_label_formats = {}  # {service type: (label type, label template) ...}
 
     dhl_datetime_format = "%Y-%m-%dT%H:%M:%S GMT"
     dhl_time_format = "%H:%M"
@@ -44,7 +50,7 @@ class DHLShipment:
                  service_type=SERVICE_TYPE_EU, currency=CURRENCY_EUR, unit=UNIT_METRIC,
                  payment_info=CUSTOMS_PAYMENT_CUSTOMER, customs_description=None, customs_value=None,
                  customs_content=CUSTOMS_NON_DOCUMENTS, special_pickup_instructions=None,
-                 pickup_time=None, drop_off_type=None):
+                 pickup_time=None, drop_off_type=None, label_type=None, label_template=None):
         self.sender = sender
         self.receiver = receiver
         self.packages = packages
@@ -62,6 +68,10 @@ class DHLShipment:
         self.drop_off_type = drop_off_type
         self.labels_path = 'labels/'
         self.special_pickup_instructions = special_pickup_instructions
+        if label_type:
+            self.label_type = label_type
+        if label_template:
+            self.label_template = label_template
 
     def automatically_set_predictable_fields(self):
         """
@@ -72,6 +82,17 @@ class DHLShipment:
         self.customs_description, self.customs_value = self.get_customs_description_and_value()
         self.drop_off_type = self.get_drop_off_type()
         self.pickup_time = self.get_pickup_time()
+        self.label_type, self.label_template = self.get_label_type_and_template()
+
+    def get_label_type_and_template(self):
+        """
+        Returns the label type and template. Values set on the shipment take precedence over the ones set for its
+        service type in service_label_formats, which take precedence over the class defaults.
+        :return: label type, label template
+        """
+        label_type, label_template = self.service_label_formats.get(
+            self.service_type, (type(self).label_type, type(self).label_template))
+        return vars(self).get('label_type') or label_type, vars(self).get('label_template') or label_template
 
     def get_pickup_time(self):
         """
@@ -136,6 +157,34 @@ class DHLShipment:
 
         return customs_description, customs_value
 
+    def split(self, max_packages):
+        """
+        Splits the shipment into sub-shipments with at most max_packages packages each. All the other fields are
+        copied from this shipment, except an explicitly set customs value, which is split between the sub-shipments
+        in proportion to the package prices (or package counts, if the packages have no price).
+        :param max_packages: maximum number of packages in a single shipment
+        :return: list of DHLShipment objects
+        """
+        sub_shipments = []
+        for start in range(0, len(self.packages), max_packages):
+            sub_shipment = copy.copy(self)
+            sub_shipment.packages = self.packages[start:start + max_packages]
+            sub_shipments.append(sub_shipment)
+
+        if self.customs_value and len(sub_shipments) > 1:
+            total_price = sum(package.price for package in self.packages)
+            remaining_value = self.customs_value
+            for sub_shipment in sub_shipments[:-1]:
+                if total_price:
+                    share = sum(package.price for package in sub_shipment.packages) / total_price
+                else:
+                    share = len(sub_shipment.packages) / len(self.packages)
+                sub_shipment.customs_value = round(self.customs_value * share, 2)
+                remaining_value -= sub_shipment.customs_value
+            sub_shipments[-1].customs_value = round(remaining_value, 2)
+
+        return sub_shipments
+
     def get_service_type(self):
         """
         Returns the DHL service type, based on the country code of the sender, and the receiver.
@@ -158,17 +207,23 @@ class DHLShipment:
     #
     def save_label_to_file(self, label_bytes):
         """
-        Saves the shipment label in bytes to a PDF file on disk.
+        Saves the shipment label in bytes to a file on disk, with the label type as the extension. A list of labels,
+        e.g. the labels of a split shipment, is saved to numbered files.
         :return:
         """
         import os.path
         import base64
 
-        pdf_decoded = base64.b64decode(label_bytes)
-
         if not os.path.exists(self.labels_path):
             os.makedirs(self.labels_path)
 
-        f = open(self.labels_path + 'label' + '.PDF', 'wb')
-        f.write(pdf_decoded)
-        f.close()
\ No newline at end of file
+        extension = '.' + self.label_type
+        if isinstance(label_bytes, list):
+            files = [('label-%d' % number + extension, label) for number, label in enumerate(label_bytes, 1)]
+        else:
+            files = [('label' + extension, label_bytes)]
+
+        for file_name, label in files:
+            f = open(self.labels_path + file_name, 'wb')
+            f.write(base64.b64decode(label))
+            f.close()
@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
+import copy
+
 from suds.client import Client
 from suds.wsse import Security, UsernameToken
 
@@ -20,6 +23,9 @@ class DHLService:
     tracking_test_url = 'https://wsbexpress.dhl.com:443/sndpt/glDHLExpressTrack?WSDL'
     tracking_url = 'https://wsbexpress.dhl.com:443/gbl/glDHLExpressTrack?WSDL'
 
+    max_packages_per_shipment = 999  # DHL Express piece limit, larger shipments are split
+    max_workers = 4  # parallel requests when sending split shipments
+
     def __init__(self, username, password, account_number, test_mode=False):
         self.username = username
         self.password = password
@@ -78,11 +84,14 @@ class DHLService:
             security.tokens.append(token)
             self.shipment_client.set_options(wsse=security)
 
+        if len(shipment.packages) > self.max_packages_per_shipment:
+            return self._send_split_shipment(shipment, message)
+
         dhl_shipment = self._create_dhl_shipment(self.shipment_client, shipment)
 
         result_code, reply = self.shipment_client.service.createShipmentRequest(message, None, dhl_shipment)
         if result_code == 500:
-            return DHLPodResponse(False, errors=[reply.detail.detailmessage])
+            return DHLShipmentResponse(False, errors=[reply.detail.detailmessage])
 
         try:
             identification_number = reply.ShipmentIdentificationNumber
@@ -102,6 +111,7 @@ class DHLService:
                     tracking_numbers=tracking_numbers,
                     identification_number=identification_number,
                     label_bytes=label_bytes,
+                    label_type=shipment.label_type,
                     dispatch_number=dispatch_number
                 )
 
@@ -114,10 +124,10 @@ class DHLService:
                 return response
 
             else:
-                print('  No PDF label!')
+                print('  No label!')
                 response = DHLShipmentResponse(
                     success=False,
-                    errors=['No PDF label.']
+                    errors=['No label.']
                 )
         except AttributeError:
             print('Unsuccessful DHL shipment request.')
@@ -203,6 +213,8 @@ class DHLService:
             dhl_shipment_events = []
             for event in shipment_events:
                 tracking_event = DHLTrackingEvent(
+                    date=getattr(event, 'Date', None),
+                    time=getattr(event, 'Time', None),
                     code=event.ServiceEvent.EventCode,
                     location_code=event.ServiceArea.ServiceAreaCode,
                     location_description=event.ServiceArea.Description
@@ -249,6 +261,48 @@ class DHLService:
     # PRIVATE METHODS ######################################################
     ########################################################################
 
+    def _send_split_shipment(self, shipment, message=None):
+        """
+        Splits a shipment that exceeds the DHL piece limit and sends the sub-shipments in parallel.
+        A failed sub-shipment does not cancel the ones that were already created, so the combined response is always
+        returned, with the errors of the failed sub-shipments.
+        :param shipment: DHLShipment object
+        :param message: optional message
+        :return: combined DHLShipmentResponse
+        """
+        def send_sub_shipment(sub_shipment):
+            return self._thread_copy().send(sub_shipment, message)
+
+        # resolved on the shipment itself, so the caller saves the labels with the right extension
+        shipment.service_type = shipment.get_service_type()
+        shipment.label_type, shipment.label_template = shipment.get_label_type_and_template()
+
+        sub_shipments = shipment.split(self.max_packages_per_shipment)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(send_sub_shipment, sub_shipment) for sub_shipment in sub_shipments]
+
+        responses = []
+        for future in futures:
+            try:
+                responses.append(future.result())
+            except Exception as e:
+                responses.append(DHLShipmentResponse(False, errors=[str(e)]))
+
+        return DHLShipmentResponse.merge(responses, shipment.label_type)
+
+    def _thread_copy(self):
+        """
+        Returns a copy of the service for use in another thread, with clones of the soap clients created so far,
+        since suds clients are not thread safe.
+        :return: DHLService
+        """
+        service = copy.copy(self)
+        for client_name in ('shipment_client', 'pod_client', 'tracking_client'):
+            client = getattr(self, client_name)
+            if client:
+                setattr(service, client_name, client.clone())
+        return service
+
     def _create_dhl_shipment_document(self, shipment_awb, detailed):
         """
         Creates the DHL request for POD retrieve.
@@ -285,11 +339,13 @@ class DHLService:
         }
         msg.Bd.GenrcRq = self.pod_client.factory.create('ns2:CdmGenericRequest_GenericRequest')
 
+        generic_criterias = list(msg.Bd.GenrcRq.GenrcRqCritr)
         for key, value in criterias.items():
             criteria = self.pod_client.factory.create('ns2:CdmGenericRequest_GenericRequestCriteria')
             criteria._TyCd = key
             criteria._Val = value
-            msg.Bd.GenrcRq.GenrcRqCritr += (criteria,)
+            generic_criterias.append(criteria)
+        msg.Bd.GenrcRq.GenrcRqCritr = generic_criterias
 
         return msg
 
@@ -342,7 +398,7 @@ class DHLService:
         dhl_shipment.Ship.Recipient.Address.CountryCode = shipment.receiver.country_code
 
         counter = 1
-        dhl_shipment.Packages.RequestedPackages = ()
+        dhl_packages = []
         for package in shipment.packages:
             dhl_package = client.factory.create('ns4:docTypeRef_RequestedPackagesType')
             dhl_package._number = str(counter)
@@ -352,8 +408,9 @@ class DHLService:
             dhl_package.Dimensions.Height = str(package.height)
             dhl_package.CustomerReferences = shipment.reference_code
 
-            dhl_shipment.Packages.RequestedPackages += (dhl_package,)
+            dhl_packages.append(dhl_package)
             counter += 1
+        dhl_shipment.Packages.RequestedPackages = tuple(dhl_packages)
 
         return dhl_shipment
 
@@ -402,7 +459,7 @@ class DHLService:
             shipment.receiver.country_code
 
         counter = 1
-        dhl_shipment.Packages.RequestedPackages = ()
+        dhl_packages = []
         for package in shipment.packages:
             dhl_package = client.factory.create(
                 'ns2:docTypeRef_RequestedPackagesType2')
@@ -412,7 +469,8 @@ class DHLService:
             dhl_package.Dimensions.Width = str(package.width)
             dhl_package.Dimensions.Height = str(package.height)
 
-            dhl_shipment.Packages.RequestedPackages += (dhl_package,)
+            dhl_packages.append(dhl_package)
             counter += 1
+        dhl_shipment.Packages.RequestedPackages = tuple(dhl_packages)
 
         return dhl_shipment
@@ -0,0 +1,212 @@
+import datetime as dt
+import re
+import sqlite3
+from datetime import datetime
+
+from dhl.resources.response import DHLTrackingEvent
+
+
+class DHLTrackingStore:
+    """
+    Embedded SQLite store for the tracking events returned by DHLService.tracking().
+    Events are deduplicated on ingestion, so the same tracking response can be added over and over again.
+    """
+
+    timestamp_format = '%Y-%m-%d %H:%M:%S'
+
+    _schema = """
+        CREATE TABLE IF NOT EXISTS tracking_event (
+            awb TEXT NOT NULL,
+            license_plate TEXT NOT NULL DEFAULT '',
+            code TEXT,
+            description TEXT,
+            location_code TEXT,
+            location_description TEXT,
+            date TEXT,
+            time TEXT,
+            timestamp TEXT,
+            UNIQUE (awb, license_plate, code, location_code, date, time)
+        );
+        CREATE INDEX IF NOT EXISTS tracking_event_awb ON tracking_event (awb, timestamp);
+        CREATE INDEX IF NOT EXISTS tracking_event_license_plate ON tracking_event (license_plate, awb, timestamp);
+        CREATE INDEX IF NOT EXISTS tracking_event_code ON tracking_event (code, timestamp);
+        CREATE INDEX IF NOT EXISTS tracking_event_location ON tracking_event (location_code, timestamp);
+        CREATE INDEX IF NOT EXISTS tracking_event_timestamp ON tracking_event (timestamp);
+    """
+
+    _columns = 'awb, license_plate, code, description, location_code, location_description, date, time'
+
+    def __init__(self, path=':memory:', check_same_thread=True):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=check_same_thread)
+        self.connection.executescript(self._schema)
+
+    def close(self):
+        self.connection.close()
+
+    def add(self, shipment_awb, tracking_response):
+        """
+        Stores the events of a successful tracking response, skipping the events that are already stored.
+        :param shipment_awb: shipment waybill the response belongs to
+        :param tracking_response: DHLTrackingResponse object
+        :return: number of newly stored events
+        """
+        if not tracking_response.success:
+            return 0
+
+        rows = []
+        for event in tracking_response.shipment_events or []:
+            rows.append(self._event_row(shipment_awb, '', event))
+        for license_plate, events in (tracking_response.pieces_events or {}).items():
+            for event in events:
+                rows.append(self._event_row(shipment_awb, license_plate, event))
+
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO tracking_event (' + self._columns + ', timestamp) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            return self.connection.total_changes - before
+
+    def events_for_shipment(self, shipment_awb):
+        """
+        Streams all the stored events of a shipment, oldest first.
+        :param shipment_awb: shipment waybill
+        :return: generator of (awb, license plate, DHLTrackingEvent), license plate is None for shipment events
+        """
+        return self._query('WHERE awb = ? ORDER BY timestamp', (str(shipment_awb),))
+
+    def events_for_piece(self, license_plate):
+        """
+        Streams all the stored events of a single piece, oldest first.
+        :param license_plate: piece license plate (tracking number)
+        :return: generator of (awb, license plate, DHLTrackingEvent)
+        """
+        return self._query('WHERE license_plate = ? ORDER BY timestamp', (str(license_plate),))
+
+    def events_with_code(self, code, since=None, until=None):
+        """
+        Streams the stored events with the given event code, optionally limited to a time window.
+        :param code: DHL event code, e.g. 'OK'
+        :param since: datetime, only events at or after it
+        :param until: datetime, only events before it
+        :return: generator of (awb, license plate, DHLTrackingEvent)
+        """
+        clause, params = self._time_window('WHERE code = ?', [code], since, until)
+        return self._query(clause + ' ORDER BY timestamp', params)
+
+    def events_at_location(self, location_code, since=None, until=None):
+        """
+        Streams the stored events at the given service area, optionally limited to a time window.
+        :param location_code: DHL service area code
+        :param since: datetime, only events at or after it
+        :param until: datetime, only events before it
+        :return: generator of (awb, license plate, DHLTrackingEvent)
+        """
+        clause, params = self._time_window('WHERE location_code = ?', [location_code], since, until)
+        return self._query(clause + ' ORDER BY timestamp', params)
+
+    def pieces_last_seen_at(self, location_code):
+        """
+        Streams the pieces whose latest event happened at the given service area. Of the events with the same latest
+        timestamp, the last stored one counts.
+        :param location_code: DHL service area code
+        :return: generator of (awb, license plate, DHLTrackingEvent) with the latest event of each piece
+        """
+        return self._query(
+            "WHERE license_plate != '' AND location_code = ? AND rowid = ("
+            "    SELECT rowid FROM tracking_event AS latest"
+            "    WHERE latest.awb = tracking_event.awb AND latest.license_plate = tracking_event.license_plate"
+            "    ORDER BY latest.timestamp DESC, latest.rowid DESC LIMIT 1"
+            ") ORDER BY awb, license_plate",
+            (location_code,)
+        )
+
+    def shipments_without_events_since(self, since):
+        """
+        Streams the shipments whose latest timestamped event is older than the given time.
+        :param since: datetime, e.g. datetime.now() - timedelta(hours=48)
+        :return: generator of (awb, datetime of the latest event)
+        """
+        cursor = self.connection.execute(
+            'SELECT awb, MAX(timestamp) AS last_timestamp FROM tracking_event '
+            'WHERE timestamp IS NOT NULL GROUP BY awb HAVING last_timestamp < ? ORDER BY last_timestamp',
+            (since.strftime(self.timestamp_format),)
+        )
+        for awb, last_timestamp in cursor:
+            yield awb, datetime.strptime(last_timestamp, self.timestamp_format)
+
+    ########################################################################
+    # PRIVATE METHODS ######################################################
+    ########################################################################
+
+    def _query(self, clause, params):
+        """
+        Runs a select over the events and yields the rows one by one, without loading the whole result.
+        :param clause: sql after the FROM part
+        :param params: query parameters
+        :return: generator of (awb, license plate, DHLTrackingEvent)
+        """
+        cursor = self.connection.execute('SELECT ' + self._columns + ' FROM tracking_event ' + clause, params)
+        for awb, license_plate, code, description, location_code, location_description, date, time in cursor:
+            event = DHLTrackingEvent(
+                code=code or None,
+                description=description,
+                location_code=location_code or None,
+                location_description=location_description,
+                date=date or None,
+                time=time or None
+            )
+            yield awb, license_plate or None, event
+
+    def _time_window(self, clause, params, since, until):
+        """
+        Appends the timestamp conditions to the where clause.
+        :return: clause, params
+        """
+        if since:
+            clause += ' AND timestamp >= ?'
+            params.append(since.strftime(self.timestamp_format))
+        if until:
+            clause += ' AND timestamp < ?'
+            params.append(until.strftime(self.timestamp_format))
+        return clause, params
+
+    def _event_row(self, shipment_awb, license_plate, event):
+        """
+        Converts a DHLTrackingEvent to a table row.
+        :return: tuple of column values
+        """
+        # the columns of the unique key are stored as '' instead of NULL, since sqlite never treats NULLs as equal
+        date = str(event.date) if event.date is not None else ''
+        time = str(event.time) if event.time is not None else ''
+        return (str(shipment_awb), str(license_plate), event.code or '', event.description, event.location_code or '',
+                event.location_description, date, time, self._parse_timestamp(event.date, event.time))
+
+    def _parse_timestamp(self, date, time):
+        """
+        Normalises the event date and time to the timestamp format. They can be date and time objects, as returned by
+        suds, or text, e.g. '2015-02-09' and '18:00', '18:00:00.000' or '18:00:00+01:00'. UTC offsets are dropped,
+        so the timestamp is the local time of the event, as for the events without an offset.
+        :param date: date object or text
+        :param time: time object or text
+        :return: formatted timestamp or None if the date or time is missing or not recognized
+        """
+        if date is None or time is None:
+            return None
+
+        if isinstance(date, dt.date):
+            date = date.strftime('%Y-%m-%d')
+        if isinstance(time, dt.time):
+            time = time.strftime('%H:%M:%S')
+
+        date = str(date).strip()[:10]
+        time = re.sub(r'(Z|[+-]\d{2}:?\d{2})$', '', str(time).strip()).split('.')[0]
+        for time_format in ('%H:%M:%S', '%H:%M'):
+            try:
+                return datetime.strptime(date + ' ' + time, '%Y-%m-%d ' + time_format).strftime(self.timestamp_format)
+            except ValueError:
+                pass
+        return None
@@ -0,0 +1,114 @@
+import threading
+
+
+class DHLTrackingStream:
+    """
+    A single stream of tracking updates, fed by polling (DHLService.tracking()) and by pushed notifications
+    (DHLPushReceiver). Updates are (shipment awb, DHLTrackingResponse) pairs and are delivered in batches to the
+    subscribed callbacks and/or to a queue. Batches are delivered one at a time, so the callbacks do not need to be
+    thread safe.
+    """
+
+    def __init__(self, batch_size=100, flush_interval=1.0, output_queue=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # seconds, max time an update waits for its batch, None to disable
+        self.output_queue = output_queue  # receives lists of (awb, DHLTrackingResponse)
+        self.callbacks = []
+        self.errors = []  # [(batch, exception) ...] for the batches a callback failed on
+        self._batch = []
+        self._lock = threading.Lock()
+        self._delivery_lock = threading.Lock()
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def subscribe(self, callback):
+        """
+        Registers a callback, called with a list of (awb, DHLTrackingResponse) for every batch.
+        :param callback: callable
+        :return:
+        """
+        self.callbacks.append(callback)
+
+    def publish(self, shipment_awb, tracking_response):
+        """
+        Adds a tracking update to the stream. Unsuccessful responses are skipped. Raises RuntimeError once the stream
+        is closed, since nothing would deliver the update anymore.
+        :param shipment_awb: shipment waybill
+        :param tracking_response: DHLTrackingResponse object
+        :return:
+        """
+        if not tracking_response.success:
+            return
+
+        with self._lock:
+            if self._stop.is_set():
+                raise RuntimeError('Tracking stream is closed.')
+            self._batch.append((str(shipment_awb), tracking_response))
+            if len(self._batch) < self.batch_size:
+                if self.flush_interval and not (self._flusher and self._flusher.is_alive()):
+                    self._start_flusher()
+                return
+            batch, self._batch = self._batch, []
+        self._deliver(batch)
+
+    def poll(self, service, shipment_awbs):
+        """
+        Pull source: requests the tracking of every shipment from the DHL service and publishes the results.
+        :param service: DHLService object
+        :param shipment_awbs: iterable of shipment waybills
+        :return:
+        """
+        for shipment_awb in shipment_awbs:
+            self.publish(shipment_awb, service.tracking(shipment_awb))
+
+    def flush(self):
+        """
+        Delivers the updates waiting for their batch to fill up.
+        :return:
+        """
+        with self._lock:
+            batch, self._batch = self._batch, []
+        if batch:
+            self._deliver(batch)
+
+    def close(self):
+        """
+        Stops the periodic flushing and delivers the remaining updates. Updates can not be published afterwards.
+        :return:
+        """
+        with self._lock:
+            self._stop.set()
+        if self._flusher:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    ########################################################################
+    # PRIVATE METHODS ######################################################
+    ########################################################################
+
+    def _start_flusher(self):
+        def flush_periodically():
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+
+        self._flusher = threading.Thread(target=flush_periodically)
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def _deliver(self, batch):
+        """
+        Hands the batch to the callbacks and the queue. A failing callback does not stop the delivery to the others,
+        the batch and the exception are recorded in errors.
+        :param batch: list of (awb, DHLTrackingResponse)
+        :return:
+        """
+        with self._delivery_lock:
+            for callback in self.callbacks:
+                try:
+                    callback(batch)
+                except Exception as e:
+                    self.errors.append((batch, e))
+            if self.output_queue is not None:
+                self.output_queue.put(batch)
+
@@ -41,9 +41,11 @@ setup(
         #'Programming Language :: Python :: 3',
         #'Programming Language :: Python :: 3.2',
         #'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
+        'Programming Language :: Python :: 3.6',
     ],
 
+    python_requires='>=3.6',
+
     packages=['dhl', 'dhl/resources'],
 
     install_requires=['suds-jurko'],
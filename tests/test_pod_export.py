@@ -0,0 +1,169 @@
+import base64
+import csv
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from dhl.pod_export import DHLPodExporter
+from dhl.resources.response import DHLPodResponse
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def pod(shipment_awb):
+    return ('%%PDF-1.4 POD of %s ' % shipment_awb).encode('ascii') * 1000
+
+
+class FakePodService:
+    """
+    Stand-in for DHLService, returning a POD for every waybill except the ones listed as missing or invalid.
+    """
+
+    def __init__(self, missing=(), invalid=(), interrupt_from=None):
+        self.missing = missing
+        self.invalid = invalid
+        self.interrupt_from = interrupt_from  # waybill from which on the export is interrupted
+        self.requested = []
+
+    def _thread_copy(self):
+        return self
+
+    def proof_of_delivery(self, shipment_awb, detailed=True):
+        self.requested.append(shipment_awb)
+        if self.interrupt_from is not None and shipment_awb >= self.interrupt_from:
+            raise Interrupted()
+        if shipment_awb in self.missing:
+            return DHLPodResponse(False, errors=['No POD found for %s' % shipment_awb])
+        if shipment_awb in self.invalid:
+            return DHLPodResponse(True, '!!!notbase64*')
+        return DHLPodResponse(True, base64.encodebytes(pod(shipment_awb)).decode('ascii'))
+
+
+class DHLPodExporterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.awbs = [str(number) for number in range(100, 107)]
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def manifest(self):
+        with open(os.path.join(self.output_dir, 'manifest.csv'), newline='') as f:
+            return {row['awb']: row for row in csv.DictReader(f)}
+
+    def part(self, number, extension='zip'):
+        return os.path.join(self.output_dir, 'pod-%05d.%s' % (number, extension))
+
+    def test_zip_export(self):
+        service = FakePodService(missing=['103'])
+        response = DHLPodExporter(service, self.output_dir, part_size=3, max_workers=2).export(self.awbs)
+
+        self.assertTrue(response.success)
+        self.assertEqual((response.exported, response.failed, response.skipped), (6, 1, 0))
+        self.assertEqual(sorted(os.listdir(self.output_dir)),
+                         ['manifest.csv', 'pod-00001.zip', 'pod-00002.zip', 'pod-00003.zip'])
+
+        manifest = self.manifest()
+        self.assertEqual(sorted(manifest), self.awbs)
+        self.assertEqual(manifest['103']['status'], 'error')
+        self.assertEqual(manifest['103']['detail'], 'No POD found for 103')
+        for shipment_awb in self.awbs:
+            if shipment_awb == '103':
+                continue
+            row = manifest[shipment_awb]
+            self.assertEqual((row['status'], row['detail']), ('ok', '%s.pdf' % shipment_awb))
+            with zipfile.ZipFile(self.part(int(row['part']))) as archive:
+                self.assertEqual(archive.read(row['detail']), pod(shipment_awb))
+
+    def test_tar_export(self):
+        for archive_format in (DHLPodExporter.FORMAT_TAR, DHLPodExporter.FORMAT_TAR_GZ):
+            output_dir = os.path.join(self.output_dir, archive_format)
+            exporter = DHLPodExporter(FakePodService(), output_dir, archive_format=archive_format)
+            self.assertEqual(exporter.export(self.awbs[:3]).exported, 3)
+
+            with tarfile.open(os.path.join(output_dir, 'pod-00001.' + archive_format)) as archive:
+                self.assertEqual(sorted(archive.getnames()), ['100.pdf', '101.pdf', '102.pdf'])
+                self.assertEqual(archive.extractfile('101.pdf').read(), pod('101'))
+
+    def test_second_run_skips_exported_shipments(self):
+        DHLPodExporter(FakePodService(missing=['103']), self.output_dir).export(self.awbs[:4])
+
+        service = FakePodService()
+        response = DHLPodExporter(service, self.output_dir).export(self.awbs)
+
+        self.assertEqual((response.exported, response.failed, response.skipped), (3, 0, 4))
+        self.assertEqual(sorted(service.requested), self.awbs[4:])
+        self.assertEqual(self.manifest()['104']['part'], '2')
+
+    def test_retry_failed(self):
+        DHLPodExporter(FakePodService(missing=['103']), self.output_dir).export(self.awbs)
+
+        service = FakePodService()
+        response = DHLPodExporter(service, self.output_dir, retry_failed=True).export(self.awbs)
+
+        self.assertEqual((response.exported, response.skipped), (1, 6))
+        self.assertEqual(service.requested, ['103'])
+        with open(os.path.join(self.output_dir, 'manifest.csv'), newline='') as f:
+            statuses = [row['status'] for row in csv.DictReader(f) if row['awb'] == '103']
+        self.assertEqual(statuses, ['error', 'ok'])
+
+    def test_interrupted_export_continues_and_rewrites_incomplete_part(self):
+        exporter = DHLPodExporter(FakePodService(interrupt_from='105'), self.output_dir, part_size=3, max_workers=1)
+        with self.assertRaises(Interrupted):
+            exporter.export(self.awbs)
+
+        # the first part is complete, the second one was left incomplete
+        self.assertEqual(sorted(self.manifest()), ['100', '101', '102'])
+        self.assertTrue(os.path.exists(self.part(2)))
+
+        service = FakePodService()
+        response = DHLPodExporter(service, self.output_dir, part_size=3, max_workers=1).export(self.awbs)
+
+        self.assertEqual((response.exported, response.skipped), (4, 3))
+        self.assertEqual(service.requested, self.awbs[3:])
+        self.assertEqual(sorted(self.manifest()), self.awbs)
+        with zipfile.ZipFile(self.part(2)) as archive:
+            names = archive.namelist()
+        self.assertEqual(len(names), 3)  # the incomplete part was replaced with a complete one
+        with zipfile.ZipFile(self.part(3)) as archive:
+            names += archive.namelist()
+        self.assertEqual(sorted(names), ['103.pdf', '104.pdf', '105.pdf', '106.pdf'])
+
+    def test_invalid_pod_is_recorded_as_error(self):
+        response = DHLPodExporter(FakePodService(invalid=['102']), self.output_dir).export(self.awbs[:4])
+
+        self.assertTrue(response.success)
+        self.assertEqual((response.exported, response.failed), (3, 1))
+        row = self.manifest()['102']
+        self.assertEqual(row['status'], 'error')
+        self.assertTrue(row['detail'].startswith('Invalid POD'))
+        with zipfile.ZipFile(self.part(1)) as archive:
+            self.assertEqual(sorted(archive.namelist()), ['100.pdf', '101.pdf', '103.pdf'])
+
+        # the recorded shipment is not requested again, so the export can finish
+        service = FakePodService()
+        self.assertEqual(DHLPodExporter(service, self.output_dir).export(self.awbs[:4]).skipped, 4)
+        self.assertEqual(service.requested, [])
+
+    def test_request_errors_are_retried_on_next_run(self):
+        class FailingService(FakePodService):
+            def proof_of_delivery(self, shipment_awb, detailed=True):
+                if shipment_awb == '101':
+                    raise IOError('Connection reset')
+                return FakePodService.proof_of_delivery(self, shipment_awb, detailed)
+
+        response = DHLPodExporter(FailingService(), self.output_dir).export(self.awbs[:3])
+
+        self.assertFalse(response.success)
+        self.assertEqual([shipment_awb for shipment_awb, error in response.errors], ['101'])
+        self.assertNotIn('101', self.manifest())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import base64
+import socket
+import threading
+import time
+import unittest
+
+from dhl.printer import DHLLabelPrinter
+from dhl.resources.response import DHLShipmentResponse
+
+
+class LocalPrinter:
+    """
+    Local stand-in for a port 9100 printer, reading a single job per connection.
+    """
+
+    def __init__(self, close_after_job=False, keep_open=False):
+        self.close_after_job = close_after_job
+        self.keep_open = keep_open  # never close, even after the client has closed its side
+        self.jobs = []
+        self.connections = 0
+        self.closed = 0
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(5)
+        self.port = self.server.getsockname()[1]
+        self._lock = threading.Lock()
+        self._open_connections = []
+        thread = threading.Thread(target=self._accept)
+        thread.daemon = True
+        thread.start()
+
+    def close(self):
+        self.server.close()
+
+    def _accept(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            thread = threading.Thread(target=self._read, args=(connection,))
+            thread.daemon = True
+            thread.start()
+
+    def _read(self, connection):
+        data = b''
+        while True:
+            chunk = connection.recv(65536)
+            data += chunk
+            if not chunk or self.close_after_job:
+                break
+        with self._lock:
+            self.jobs.append(data)
+        if self.keep_open:
+            self._open_connections.append(connection)
+        else:
+            connection.close()
+            self.closed += 1
+
+    def wait_for(self, condition):
+        deadline = time.time() + 5
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+
+
+def encode(label):
+    return base64.b64encode(label).decode('ascii')
+
+
+class RecordingLabelPrinter(DHLLabelPrinter):
+    """
+    Records the size of every batch and holds the workers until all the labels are queued.
+    """
+
+    def __init__(self, *args, **kwargs):
+        DHLLabelPrinter.__init__(self, *args, **kwargs)
+        self.batches = []
+        self.queued = threading.Event()
+
+    def _send(self, connection, labels):
+        self.queued.wait(5)
+        self.batches.append(len(labels))
+        return DHLLabelPrinter._send(self, connection, labels)
+
+
+class DHLLabelPrinterTest(unittest.TestCase):
+
+    def test_labels_are_sent_in_batches_over_pooled_connections(self):
+        printer = LocalPrinter()
+        with RecordingLabelPrinter('127.0.0.1', printer.port, pool_size=2, batch_size=5) as label_printer:
+            for number in range(20):
+                label_printer.print_label(encode(b'^XA^FD%d^FS^XZ' % number))
+            label_printer.queued.set()
+            label_printer.flush()
+        printer.close()
+
+        data = b''.join(printer.jobs)
+        self.assertEqual(data.count(b'^XA'), 20)
+        for number in range(20):
+            self.assertIn(b'^FD%d^FS' % number, data)
+        self.assertEqual(sum(label_printer.batches), 20)
+        self.assertLessEqual(len(label_printer.batches), 6)
+        self.assertEqual(max(label_printer.batches), 5)
+        self.assertLessEqual(printer.connections, 2)
+        self.assertEqual(label_printer.errors, [])
+
+    def test_connection_is_reused_between_batches(self):
+        printer = LocalPrinter()
+        with DHLLabelPrinter('127.0.0.1', printer.port) as label_printer:
+            for number in range(3):
+                label_printer.print_label(encode(b'^XA%d^XZ' % number))
+                label_printer.flush()
+        printer.close()
+
+        self.assertEqual(printer.connections, 1)
+        self.assertEqual(printer.jobs, [b'^XA0^XZ^XA1^XZ^XA2^XZ'])
+
+    def test_printer_closing_after_each_job(self):
+        printer = LocalPrinter(close_after_job=True)
+        with DHLLabelPrinter('127.0.0.1', printer.port) as label_printer:
+            for number in range(5):
+                label_printer.print_label(encode(b'^XA%d^XZ' % number))
+                label_printer.flush()
+                printer.wait_for(lambda: printer.closed == number + 1)
+        printer.close()
+
+        self.assertEqual(sorted(printer.jobs), [b'^XA%d^XZ' % number for number in range(5)])
+        self.assertEqual(printer.connections, 5)
+        self.assertEqual(label_printer.errors, [])
+
+    def test_close_does_not_wait_for_printer_keeping_connection_open(self):
+        printer = LocalPrinter(keep_open=True)
+        label_printer = DHLLabelPrinter('127.0.0.1', printer.port)
+        label_printer.print_label(encode(b'^XA^XZ'))
+        label_printer.flush()
+
+        start = time.time()
+        label_printer.close()
+        printer.wait_for(lambda: printer.jobs)
+        printer.close()
+
+        self.assertLess(time.time() - start, DHLLabelPrinter.close_timeout + 1)
+        self.assertEqual(printer.jobs, [b'^XA^XZ'])
+
+    def test_print_response_sends_all_labels(self):
+        printer = LocalPrinter()
+        response = DHLShipmentResponse.merge([
+            DHLShipmentResponse(True, ['1'], '100', label_bytes=encode(b'^XA1^XZ')),
+            DHLShipmentResponse(True, ['2'], '200', label_bytes=encode(b'^XA2^XZ'))
+        ], 'ZPL')
+        with DHLLabelPrinter('127.0.0.1', printer.port) as label_printer:
+            label_printer.print_response(response)
+        printer.close()
+
+        self.assertEqual(b''.join(printer.jobs), b'^XA1^XZ^XA2^XZ')
+
+    def test_print_response_rejects_pdf_labels(self):
+        response = DHLShipmentResponse(True, ['1'], '100', label_bytes=encode(b'%PDF-1.4'), label_type='PDF')
+        label_printer = DHLLabelPrinter('127.0.0.1', 9100)
+
+        with self.assertRaises(ValueError):
+            label_printer.print_response(response)
+        label_printer.close()
+
+    def test_unreachable_printer_records_errors(self):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        port = server.getsockname()[1]
+        server.close()
+
+        label_printer = DHLLabelPrinter('127.0.0.1', port, timeout=1)
+        label_printer.print_label(encode(b'^XA^XZ'))
+        label_printer.close()
+
+        self.assertEqual(len(label_printer.errors), 1)
+        self.assertEqual(label_printer.errors[0][0], b'^XA^XZ')
+
+
+if __name__ == '__main__':
+    unittest.main()
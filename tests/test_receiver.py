@@ -0,0 +1,121 @@
+import http.client
+import json
+import queue
+import unittest
+
+from dhl.receiver import DHLPushReceiver
+from dhl.resources.response import DHLTrackingResponse, DHLTrackingEvent
+from dhl.store import DHLTrackingStore
+from dhl.stream import DHLTrackingStream
+
+
+NOTIFICATION = {
+    'shipments': [{
+        'awb': '1234567890',
+        'events': [
+            {'code': 'PU', 'location_code': 'LJU', 'date': '2015-02-09', 'time': '18:00'},
+            {'piece': 'JD0001', 'code': 'PU', 'location_code': 'LJU', 'date': '2015-02-09', 'time': '18:00:00'},
+            {'piece': 'JD0001', 'code': 'AF', 'location_code': 'LEJ', 'date': '2015-02-10', 'time': '02:30:00'},
+        ]
+    }]
+}
+
+
+class FakeService:
+    """
+    Stand-in for DHLService, returning a fixed tracking response.
+    """
+
+    def tracking(self, shipment_awb):
+        return DHLTrackingResponse(True, shipment_events=[], pieces_events={
+            'JD0002': [DHLTrackingEvent(code='OK', location_code='LJU', date='2015-02-11', time='10:00:00')]
+        })
+
+
+class DHLPushReceiverTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = queue.Queue()
+        self.stream = DHLTrackingStream(batch_size=10, flush_interval=0.05, output_queue=self.queue)
+        self.receiver = DHLPushReceiver(self.stream, host='127.0.0.1', port=0, path='/dhl', token='secret')
+        self.receiver.start()
+
+    def tearDown(self):
+        self.receiver.stop()
+        self.stream.close()
+
+    def post(self, body, headers=None):
+        """
+        Local stand-in for the sender of the notifications.
+        """
+        connection = http.client.HTTPConnection('127.0.0.1', self.receiver.port, timeout=5)
+        connection.putrequest('POST', '/dhl')
+        for name, value in (headers or {'Authorization': 'secret', 'Content-Length': str(len(body))}).items():
+            connection.putheader(name, value)
+        connection.endheaders(body)
+        status = connection.getresponse().status
+        connection.close()
+        return status
+
+    def test_notification_is_published(self):
+        self.assertEqual(self.post(json.dumps(NOTIFICATION).encode('utf-8')), 200)
+
+        batch = self.queue.get(timeout=2)
+        self.assertEqual(len(batch), 1)
+        shipment_awb, tracking_response = batch[0]
+        self.assertEqual(shipment_awb, '1234567890')
+        self.assertEqual([event.code for event in tracking_response.shipment_events], ['PU'])
+        self.assertEqual([event.code for event in tracking_response.pieces_events['JD0001']], ['PU', 'AF'])
+
+    def test_push_and_poll_feed_the_same_store(self):
+        store = DHLTrackingStore(check_same_thread=False)
+        self.stream.subscribe(lambda batch: [store.add(awb, response) for awb, response in batch])
+
+        self.assertEqual(self.post(json.dumps(NOTIFICATION).encode('utf-8')), 200)
+        self.stream.poll(FakeService(), ['1234567890'])
+        self.stream.close()
+
+        pieces = [(awb, license_plate, event.code) for awb, license_plate, event in store.pieces_last_seen_at('LJU')]
+        self.assertEqual(pieces, [('1234567890', 'JD0002', 'OK')])
+        self.assertEqual(len(list(store.events_for_shipment('1234567890'))), 4)
+
+    def test_invalid_requests_are_rejected(self):
+        body = json.dumps(NOTIFICATION).encode('utf-8')
+        self.assertEqual(self.post(body, {'Authorization': 'wrong', 'Content-Length': str(len(body))}), 401)
+        self.assertEqual(self.post(body, {'Authorization': b'\xe9', 'Content-Length': str(len(body))}), 401)
+        self.assertEqual(self.post(b'{"shipments": [{}]}'), 400)
+        self.assertEqual(self.post(b'', {'Authorization': 'secret', 'Content-Length': '-1'}), 400)
+        self.assertEqual(self.post(b'', {'Authorization': 'secret'}), 411)
+        self.assertEqual(self.post(b'', {'Authorization': 'secret', 'Content-Length': str(10 ** 12)}), 413)
+        self.assertTrue(self.queue.empty())
+
+    def test_token_is_required_on_external_interfaces(self):
+        receiver = DHLPushReceiver(self.stream, host='0.0.0.0', port=0)
+        with self.assertRaises(ValueError):
+            receiver.start()
+        self.assertEqual(DHLPushReceiver(self.stream).host, '127.0.0.1')
+
+    def test_publish_after_close_is_rejected(self):
+        self.stream.close()
+
+        with self.assertRaises(RuntimeError):
+            self.stream.publish('1234567890', FakeService().tracking('1234567890'))
+        self.assertEqual(self.post(json.dumps(NOTIFICATION).encode('utf-8')), 503)
+
+    def test_failing_callback_does_not_stop_the_stream(self):
+        def fail(batch):
+            raise RuntimeError('callback failed')
+
+        self.stream.subscribe(fail)
+        body = json.dumps(NOTIFICATION).encode('utf-8')
+        self.assertEqual(self.post(body), 200)
+        self.queue.get(timeout=2)
+        self.assertEqual(self.post(body), 200)
+        self.queue.get(timeout=2)
+
+        self.assertEqual(len(self.stream.errors), 2)
+        self.assertIsInstance(self.stream.errors[0][1], RuntimeError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import base64
+import unittest
+
+from dhl.resources.address import DHLPerson
+from dhl.resources.package import DHLPackage
+from dhl.resources.response import DHLShipmentResponse
+from dhl.resources.shipment import DHLShipment
+
+try:
+    from dhl.service import DHLService
+except ImportError:  # suds-jurko is not installed
+    DHLService = None
+
+
+def encode(label):
+    return base64.b64encode(label).decode('ascii')
+
+
+def create_shipment(prices, **kwargs):
+    sender = DHLPerson('Jon Doe', 'Street 1', 'Ljubljana', '1000', 'SI', '123', 'jon@example.com')
+    receiver = DHLPerson('Jane Doe', 'Street 2', 'Berlin', '10115', 'DE', '456', 'jane@example.com')
+    packages = [DHLPackage(1, 10, 10, 10, price=price, description='Product') for price in prices]
+    return DHLShipment(sender, receiver, packages, **kwargs)
+
+
+class DHLShipmentSplitTest(unittest.TestCase):
+
+    def test_split_packages(self):
+        sub_shipments = create_shipment([1] * 5).split(2)
+        self.assertEqual([len(sub_shipment.packages) for sub_shipment in sub_shipments], [2, 2, 1])
+
+    def test_customs_value_is_split_by_package_price(self):
+        sub_shipments = create_shipment([10, 10, 10, 30, 30], customs_value=1000).split(2)
+        self.assertEqual([sub_shipment.customs_value for sub_shipment in sub_shipments], [222.22, 444.44, 333.34])
+        self.assertAlmostEqual(sum(sub_shipment.customs_value for sub_shipment in sub_shipments), 1000)
+
+    def test_customs_value_is_split_by_package_count_without_prices(self):
+        sub_shipments = create_shipment([0, 0, 0], customs_value=100).split(2)
+        self.assertEqual([sub_shipment.customs_value for sub_shipment in sub_shipments], [66.67, 33.33])
+
+    def test_customs_value_is_calculated_per_sub_shipment_when_not_set(self):
+        sub_shipments = create_shipment([10, 20, 30]).split(2)
+        self.assertEqual([sub_shipment.get_customs_description_and_value()[1] for sub_shipment in sub_shipments],
+                         [30, 30])
+
+
+class DHLShipmentResponseMergeTest(unittest.TestCase):
+
+    def test_merge_with_failed_sub_shipment(self):
+        merged = DHLShipmentResponse.merge([
+            DHLShipmentResponse(False, errors=['Timeout']),
+            DHLShipmentResponse(True, ['1', '2'], '100', label_bytes=encode(b'^XA1^XZ')),
+            DHLShipmentResponse(True, ['3'], '200', label_bytes=encode(b'^XA2^XZ')),
+        ], 'ZPL')
+
+        self.assertFalse(merged.success)
+        self.assertEqual(merged.errors, ['Timeout'])
+        self.assertEqual(merged.tracking_numbers, ['1', '2', '3'])
+        self.assertEqual(merged.identification_number, '100')
+        self.assertEqual(merged.identification_numbers, ['100', '200'])
+        self.assertEqual(merged.label_type, 'ZPL')
+        self.assertEqual(base64.b64decode(merged.label_bytes), b'^XA1^XZ^XA2^XZ')
+        self.assertEqual(len(merged.sub_responses), 3)
+
+    def test_merge_pdf_labels(self):
+        merged = DHLShipmentResponse.merge([
+            DHLShipmentResponse(True, ['1'], '100', label_bytes=encode(b'%PDF-1')),
+            DHLShipmentResponse(True, ['2'], '200', label_bytes=encode(b'%PDF-2')),
+        ], 'PDF')
+
+        self.assertTrue(merged.success)
+        self.assertIsNone(merged.errors)
+        self.assertIsNone(merged.label_bytes)
+        self.assertEqual(len(merged.labels), 2)
+
+
+class FakeSubShipmentService:
+    """
+    Stand-in for the thread copy of DHLService, failing for the sub-shipment with a single package.
+    """
+
+    def send(self, shipment, message=None):
+        if len(shipment.packages) == 1:
+            raise IOError('Connection reset')
+        return DHLShipmentResponse(True, ['JD%d' % id(package) for package in shipment.packages], 'AWB',
+                                   label_bytes=encode(b'^XA^XZ'), label_type=shipment.label_type)
+
+
+@unittest.skipIf(DHLService is None, 'suds-jurko is not installed')
+class DHLServiceSplitShipmentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.service = DHLService('username', 'password', '123456789')
+        self.service.max_packages_per_shipment = 2
+        self.service._thread_copy = FakeSubShipmentService
+        self.service_label_formats = DHLShipment.service_label_formats
+
+    def tearDown(self):
+        DHLShipment.service_label_formats = self.service_label_formats
+
+    def test_raising_sub_shipment_becomes_failed_response(self):
+        response = self.service._send_split_shipment(create_shipment([1] * 5))
+
+        self.assertFalse(response.success)
+        self.assertEqual(response.errors, ['Connection reset'])
+        self.assertEqual(len(response.tracking_numbers), 4)
+        self.assertEqual(response.identification_numbers, ['AWB', 'AWB'])
+        self.assertEqual(len(response.sub_responses), 3)
+
+    def test_label_type_is_resolved_on_the_shipment(self):
+        DHLShipment.service_label_formats = {DHLShipment.SERVICE_TYPE_EU: (DHLShipment.LABEL_TYPE_ZPL, 'ECOM26_84_001')}
+        shipment = create_shipment([1] * 4)
+
+        response = self.service._send_split_shipment(shipment)
+
+        self.assertEqual(shipment.label_type, 'ZPL')
+        self.assertEqual(response.label_type, 'ZPL')
+        self.assertEqual(base64.b64decode(response.label_bytes), b'^XA^XZ^XA^XZ')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import datetime as dt
+import unittest
+from datetime import datetime
+
+from dhl.resources.response import DHLTrackingResponse, DHLTrackingEvent
+from dhl.store import DHLTrackingStore
+
+
+def event(code, location_code, date=None, time=None):
+    return DHLTrackingEvent(code=code, location_code=location_code, date=date, time=time)
+
+
+def codes(results):
+    return [(awb, license_plate, tracking_event.code) for awb, license_plate, tracking_event in results]
+
+
+class DHLTrackingStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.store = DHLTrackingStore()
+        self.response = DHLTrackingResponse(
+            success=True,
+            shipment_events=[event('PU', 'LJU')],
+            pieces_events={
+                'JD01': [event('PU', 'LJU', '2015-02-09', '18:00:00'), event('AF', 'LEJ', '2015-02-10', '02:30')],
+                'JD02': [event('PU', 'LJU', dt.date(2015, 2, 9), dt.time(18, 5))],
+            }
+        )
+        self.store.add('100', self.response)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_adding_the_same_response_stores_nothing_new(self):
+        self.assertEqual(self.store.add('100', self.response), 0)
+        self.assertEqual(len(list(self.store.events_for_shipment('100'))), 4)
+
+        self.response.pieces_events['JD01'].append(event('OK', 'LEJ', '2015-02-10', '09:00'))
+        self.assertEqual(self.store.add('100', self.response), 1)
+
+    def test_unsuccessful_response_is_skipped(self):
+        self.assertEqual(self.store.add('200', DHLTrackingResponse(False, errors=['No pieces found.'])), 0)
+
+    def test_events_for_shipment_and_piece(self):
+        self.assertEqual(codes(self.store.events_for_shipment('100')),
+                         [('100', None, 'PU'), ('100', 'JD01', 'PU'), ('100', 'JD02', 'PU'), ('100', 'JD01', 'AF')])
+        self.assertEqual(codes(self.store.events_for_piece('JD01')), [('100', 'JD01', 'PU'), ('100', 'JD01', 'AF')])
+
+    def test_events_with_code_and_location_in_time_window(self):
+        self.assertEqual(len(list(self.store.events_with_code('PU'))), 3)
+        self.assertEqual(codes(self.store.events_with_code('PU', since=datetime(2015, 2, 9, 18, 1))),
+                         [('100', 'JD02', 'PU')])
+        self.assertEqual(codes(self.store.events_at_location('LJU', until=datetime(2015, 2, 9, 18, 1))),
+                         [('100', 'JD01', 'PU')])
+        self.assertEqual(codes(self.store.events_at_location('LEJ', since=datetime(2015, 2, 10))),
+                         [('100', 'JD01', 'AF')])
+
+    def test_events_without_timestamp_are_not_in_time_windows(self):
+        self.store.add('300', DHLTrackingResponse(True, [], {'JD03': [event('PU', 'LJU', 'unknown', '18:00')]}))
+
+        self.assertEqual(len(list(self.store.events_for_piece('JD03'))), 1)
+        self.assertEqual(codes(self.store.events_with_code('PU', since=datetime(2000, 1, 1))),
+                         [('100', 'JD01', 'PU'), ('100', 'JD02', 'PU')])
+        self.assertEqual(list(self.store.shipments_without_events_since(datetime(2030, 1, 1)))[-1][0], '100')
+
+    def test_timestamps_with_utc_offset(self):
+        offset = dt.timezone(dt.timedelta(hours=1))
+        self.store.add('400', DHLTrackingResponse(True, [], {
+            'JD04': [event('PU', 'LJU', dt.date(2015, 3, 1), dt.time(8, 0, tzinfo=offset)),
+                     event('AF', 'LEJ', '2015-03-01', '12:00:00+01:00')]
+        }))
+
+        self.assertEqual(codes(self.store.events_with_code('AF', since=datetime(2015, 3, 1))),
+                         [('400', 'JD04', 'AF')])
+        self.assertEqual(codes(self.store.pieces_last_seen_at('LEJ')), [('100', 'JD01', 'AF'), ('400', 'JD04', 'AF')])
+
+    def test_pieces_last_seen_at(self):
+        self.assertEqual(codes(self.store.pieces_last_seen_at('LJU')), [('100', 'JD02', 'PU')])
+        self.assertEqual(codes(self.store.pieces_last_seen_at('LEJ')), [('100', 'JD01', 'AF')])
+
+    def test_pieces_last_seen_at_with_same_timestamp(self):
+        self.store.add('500', DHLTrackingResponse(True, [], {
+            'JD05': [event('AF', 'LEJ', '2015-04-01', '10:00'), event('AR', 'LJU', '2015-04-01', '10:00')]
+        }))
+        # a piece with the same license plate on another shipment does not hide the latest event
+        self.store.add('600', DHLTrackingResponse(True, [], {'JD05': [event('PU', 'VIE', '2015-05-01', '10:00')]}))
+
+        self.assertEqual(codes(self.store.pieces_last_seen_at('LJU')),
+                         [('100', 'JD02', 'PU'), ('500', 'JD05', 'AR')])
+        self.assertEqual(codes(self.store.pieces_last_seen_at('LEJ')), [('100', 'JD01', 'AF')])
+
+    def test_shipments_without_events_since(self):
+        self.store.add('700', DHLTrackingResponse(True, [], {'JD07': [event('PU', 'LJU', '2015-06-01', '10:00')]}))
+
+        self.assertEqual(list(self.store.shipments_without_events_since(datetime(2015, 5, 1))),
+                         [('100', datetime(2015, 2, 10, 2, 30))])
+        self.assertEqual(len(list(self.store.shipments_without_events_since(datetime(2015, 7, 1)))), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()